@@ -1,11 +1,10 @@
 # One-time ICS builder for FIDE event pages (JS-rendered).
 # Outputs: docs/fide_events.ics
 
-import asyncio, os, re, json, hashlib
-from datetime import datetime, date, timedelta
-from dateutil import parser as dtp
-from ics import Calendar, Event
-from playwright.async_api import async_playwright
+import asyncio, os, re, json, hashlib, functools
+from datetime import datetime, date, timedelta, timezone
+from dateutil.parser import parse as dt_parse
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 
 URLS = [
     "https://calendar.fide.com/calendar.php?id=3079",
@@ -23,15 +22,55 @@ URLS = [
     "https://calendar.fide.com/calendar.php?id=3613",
 ]
 
+# How many pages to load concurrently
+MAX_PARALLEL = 4
+
+# Images, fonts and media are never read; blocking them lets pages settle sooner.
+# Stylesheets are kept because innerText depends on layout (hidden blocks).
+# Matched by URL in Chromium itself (CDP Network.setBlockedURLs), not via route():
+# a route sends every request through Python and disables the context's HTTP cache.
+BLOCKED_EXTENSIONS = (
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico",
+    "woff", "woff2", "ttf", "otf", "eot",
+    "mp4", "webm", "mp3", "ogg",
+)
+BLOCKED_URL_PATTERNS = [p for ext in BLOCKED_EXTENSIONS for p in (f"*.{ext}", f"*.{ext}?*")]
+
+# Navigation budget (ms), and how long to wait for rendered content after that
+GOTO_TIMEOUT_MS = 15000
+READY_TIMEOUT_MS = 10000
+
+# Hard cap (s) on one URL's scrape, counted from when it gets a page
+SCRAPE_TIMEOUT_S = 45
+
+# Upper bound on page text sent back from the browser (date fallback + snippet only)
+MAX_TEXT_CHARS = 50000
+
 OUT_DIR = "docs"
 ICS_PATH = os.path.join(OUT_DIR, "fide_events.ics")
 
+# Site-wide title text that says nothing about the event itself
+_GENERIC_TITLE_FRAGMENTS = ("International Chess Federation",)
+
 MONTHS = r"(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Sept|Oct|Nov|Dec|January|February|March|April|June|July|August|September|October|November|December)"
 
+# Compiled once at import; used per page below
+_RANGE_SAME_MON_RE = re.compile(
+    rf"\b(\d{{1,2}})\s*(?:–|-|to)\s*(\d{{1,2}})\s+{MONTHS}\s+(\d{{4}})\b", re.I)
+_RANGE_TWO_DATES_RE = re.compile(
+    rf"\b(\d{{1,2}}\s+{MONTHS}\s+\d{{4}})\s*(?:–|-|to)\s*(\d{{1,2}}\s+{MONTHS}?\s*\d{{4}}?)\b", re.I)
+_DT_WITH_TIME_RE = re.compile(
+    rf"\b(\d{{1,2}}\s+{MONTHS}\s+\d{{4}})\s+(\d{{1,2}}:\d{{2}})"
+    rf"(?:\s*[-–]\s*(\d{{1,2}}:\d{{2}}))?", re.I)
+_SINGLE_DATE_RE = re.compile(rf"\b(\d{{1,2}}\s+{MONTHS}\s+\d{{4}})\b", re.I)
+
+_WS_TRAILING_RE = re.compile(r"[ \t]+\n")
+_MULTI_BLANK_RE = re.compile(r"\n{3,}")
+
 def clean_text(s: str) -> str:
     s = (s or "").replace("\r", "")
-    s = re.sub(r"[ \t]+\n", "\n", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)
+    s = _WS_TRAILING_RE.sub("\n", s)
+    s = _MULTI_BLANK_RE.sub("\n\n", s)
     return s.strip()
 
 def first_nonempty(*vals):
@@ -40,9 +79,22 @@ def first_nonempty(*vals):
             return v.strip()
     return None
 
+# Shapes produced by the date regexes; tried before dateutil's heuristics
+_FAST_FORMATS = ("%d %b %Y", "%d %B %Y", "%d %b %Y %H:%M", "%d %B %Y %H:%M")
+
+# Same strings recur across fields and text fallbacks; datetimes are immutable so sharing is safe
+@functools.lru_cache(maxsize=4096)
 def parse_maybe_dt(s):
     if not s: return None
-    try: return dtp.parse(s, dayfirst=True)
+    s = s.strip()
+    # Year-first values are most likely ISO 8601 (e.g. '2025-08-20T10:00:00Z')
+    if s[:4].isdigit():
+        try: return datetime.fromisoformat(s.replace("Z", "+00:00"))
+        except ValueError: pass
+    for fmt in _FAST_FORMATS:
+        try: return datetime.strptime(s, fmt)
+        except ValueError: pass
+    try: return dt_parse(s, dayfirst=True)
     except Exception: return None
 
 def parse_date_range_from_text(text: str):
@@ -57,8 +109,7 @@ def parse_date_range_from_text(text: str):
     joined = " ".join(lines)
 
     # Full range with both days/months
-    m = re.search(
-        rf"\b(\d{{1,2}})\s*(?:–|-|to)\s*(\d{{1,2}})\s+{MONTHS}\s+(\d{{4}})\b", joined, re.I)
+    m = _RANGE_SAME_MON_RE.search(joined)
     if m:
         d1, d2, mon, year = m.groups()
         start = parse_maybe_dt(f"{d1} {mon} {year}")
@@ -70,8 +121,7 @@ def parse_date_range_from_text(text: str):
             return start, end, False
 
     # Range where month written only once at the end, or mixed wording "to"
-    m = re.search(
-        rf"\b(\d{{1,2}}\s+{MONTHS}\s+\d{{4}})\s*(?:–|-|to)\s*(\d{{1,2}}\s+{MONTHS}?\s*\d{{4}}?)\b", joined, re.I)
+    m = _RANGE_TWO_DATES_RE.search(joined)
     if m:
         s1, s2 = m.groups()[0], m.group(2)
         s = parse_maybe_dt(s1)
@@ -80,9 +130,7 @@ def parse_date_range_from_text(text: str):
             return s, e, False
 
     # Single explicit datetime with time
-    m = re.search(
-        rf"\b(\d{{1,2}}\s+{MONTHS}\s+\d{{4}})\s+(\d{{1,2}}:\d{{2}})"
-        rf"(?:\s*[-–]\s*(\d{{1,2}}:\d{{2}}))?", joined, re.I)
+    m = _DT_WITH_TIME_RE.search(joined)
     if m:
         dpart, t1, t2 = m.group(1), m.group(2), m.group(3)
         s = parse_maybe_dt(f"{dpart} {t1}")
@@ -90,7 +138,7 @@ def parse_date_range_from_text(text: str):
         return s, e, True
 
     # Single date only
-    m = re.search(rf"\b(\d{{1,2}}\s+{MONTHS}\s+\d{{4}})\b", joined, re.I)
+    m = _SINGLE_DATE_RE.search(joined)
     if m:
         d = parse_maybe_dt(m.group(1))
         if d:
@@ -99,48 +147,71 @@ def parse_date_range_from_text(text: str):
     return None, None, False
 
 def event_uid(url: str) -> str:
-    h = hashlib.sha256(url.encode("utf-8")).hexdigest()
-    return f"{h[:32]}@fid-event-scrape"
-
+    # Only needs to be stable per URL; a 16-byte blake2b digest is already 32 hex chars
+    h = hashlib.blake2b(url.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{h}@fid-event-scrape"
+
+# Strips obvious chrome (header/footer/nav) and grabs a targeted main block.
+# __ready() is the wait gate: true once the event content itself has rendered.
+# Registered once per context via add_init_script so the source isn't re-sent per URL;
+# wrapped in a function so its helpers don't leak into the page's globals.
+EXTRACTOR_JS = r"""
+(() => {
+  const CHROME = 'header, footer, nav, .navbar, .site-header, .site-footer';
+  // Labelled lines (Date, Venue, Location, City, Country, etc.);
+  // [^\S\n] keeps each match on a single line
+  const FIELD_LINE = /^[^\S\n]*([A-Za-z ]{3,30})[^\S\n]*:[^\S\n]*(.+)$/gm;
+  const HAS_FIELD_LINE = new RegExp(FIELD_LINE.source, 'm');
+
+  window.__ready = () => {
+    // Checked before chrome is stripped, so ignore anything inside it
+    const h1 = [...document.querySelectorAll('h1')].some(
+      n => !n.closest(CHROME) && n.innerText.trim());
+    if (h1) return true;
+    const main = document.querySelector('main') || document.querySelector('#main');
+    return !!main && HAS_FIELD_LINE.test(main.innerText || '');
+  };
+
+  window.__scrape = (maxText) => {
+    document.querySelectorAll(CHROME).forEach(n => n.remove());
+    const main = document.querySelector('main') || document.querySelector('#main') ||
+                 document.querySelector('.container, .content, .page-content') || document.body;
+    const text = (main.innerText || '').trim();
+    const h1 = (document.querySelector('h1')?.innerText || '').trim();
+    // Try also breadcrumbs / subheads for a specific title
+    const h2 = (document.querySelector('h2')?.innerText || '').trim();
+    const titleCandidates = [h1, h2, document.title].filter(Boolean);
+    // Later lines win
+    const fields = {};
+    for (const m of text.matchAll(FIELD_LINE)) {
+      fields[m[1].trim().toLowerCase()] = m[2].trim();
+    }
+    // Fields above see the whole page; only the (capped) text itself is shipped back
+    return { text: text.slice(0, maxText), titleCandidates, fields };
+  };
+})();
+"""
 async def scrape_one(page, url):
-    await page.goto(url, wait_until="networkidle")
-
-    # Strip obvious chrome (header/footer/nav) and grab a targeted main block
-    full = await page.evaluate("""
-        () => {
-          for (const sel of ['header','footer','nav','.navbar','.site-header','.site-footer']) {
-            document.querySelectorAll(sel).forEach(n=>n.remove());
-          }
-          const main = document.querySelector('main') || document.querySelector('#main') ||
-                       document.querySelector('.container, .content, .page-content') || document.body;
-          const text = (main.innerText || '').trim();
-          const h1 = (document.querySelector('h1')?.innerText || '').trim();
-          // Try also breadcrumbs / subheads for a specific title
-          const h2 = (document.querySelector('h2')?.innerText || '').trim();
-          const titleCandidates = [h1, h2, document.title].filter(Boolean);
-          return { text, titleCandidates };
-        }
-    """)
+    # Don't wait for networkidle (analytics beacons keep it busy); wait until the
+    # JS-rendered event content is there instead (see __ready in EXTRACTOR_JS)
+    await page.goto(url, wait_until="domcontentloaded", timeout=GOTO_TIMEOUT_MS)
+    try:
+        await page.wait_for_function("__ready()", timeout=READY_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        pass  # nothing rendered in time; extract whatever is there
+
+    # Extractor is installed by EXTRACTOR_JS on every document in the context
+    full = await page.evaluate("n => __scrape(n)", MAX_TEXT_CHARS)
     text = clean_text(full["text"])
     titleCandidates = full["titleCandidates"]
 
     # Prefer non-generic title
-    title = None
-    for cand in titleCandidates:
-        if cand and "International Chess Federation" not in cand:
-            title = cand
-            break
-    if not title:
-        title = titleCandidates[0] if titleCandidates else "FIDE Event"
-
-    # Try to parse a dictionary of labelled fields (Date, Venue, Location, City, Country, etc.)
-    fields = {}
-    for line in text.splitlines():
-        m = re.match(r"^\s*([A-Za-z ]{3,30})\s*:\s*(.+)$", line)
-        if m:
-            key = m.group(1).strip().lower()
-            val = m.group(2).strip()
-            fields[key] = val
+    title = next(
+        (c for c in titleCandidates if c and not any(g in c for g in _GENERIC_TITLE_FRAGMENTS)),
+        titleCandidates[0] if titleCandidates else "FIDE Event")
+
+    # Labelled fields are extracted in the page; text is only the fallback for dates/snippet
+    fields = full["fields"]
 
     # Build location from best available cues
     location = first_nonempty(
@@ -204,50 +275,124 @@ async def scrape_one(page, url):
         "url": url,
     }
 
+def placeholder_record(url):
+    # Stand-in for a page that couldn't be scraped in time; still links to the source
+    return {
+        "title": "FIDE Event",
+        "location": "",
+        "start_dt": None,
+        "end_dt": None,
+        "has_time": False,
+        "description": f"Source: {url}",
+        "url": url,
+    }
+
+# iCalendar TEXT escaping (RFC 5545 3.3.11); newlines are handled separately
+_ICS_ESC_RE = re.compile(r"([\\;,])")
+
+ICS_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//fid-event-scrape//EN\r\n"
+ICS_FOOTER = "END:VCALENDAR\r\n"
+
+def ics_text(s):
+    return _ICS_ESC_RE.sub(r"\\\1", s or "").replace("\n", "\\n")
+
+def ics_utc(dt):
+    # Naive datetimes are taken as UTC, as the ics/arrow serializer did before
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+def fold_line(line):
+    # Content lines are limited to 75 octets; continuation lines start with a space
+    b = line.encode("utf-8")
+    parts, start, limit = [], 0, 75
+    while start < len(b):
+        end = min(start + limit, len(b))
+        while end < len(b) and (b[end] & 0xC0) == 0x80:  # don't split a UTF-8 sequence
+            end -= 1
+        parts.append(b[start:end].decode("utf-8"))
+        start, limit = end, 74
+    return "\r\n ".join(parts) + "\r\n"
+
+def make_vevent(r, dtstamp):
+    props = [
+        ("UID", event_uid(r["url"])),
+        ("DTSTAMP", dtstamp),
+        ("SUMMARY", ics_text(r["title"])),
+        ("DESCRIPTION", ics_text(r["description"])),
+    ]
+    if r["location"]:
+        props.append(("LOCATION", ics_text(r["location"])))
+
+    if r["start_dt"]:
+        if r["has_time"] or (isinstance(r["start_dt"], datetime) and r["start_dt"].time() != datetime.min.time()):
+            props.append(("DTSTART", ics_utc(r["start_dt"])))
+            if r["end_dt"]:
+                props.append(("DTEND", ics_utc(r["end_dt"])))
+        else:
+            # All-day event(s)
+            start_d = r["start_dt"].date() if isinstance(r["start_dt"], datetime) else r["start_dt"]
+            if r["end_dt"]:
+                end_d = r["end_dt"].date() if isinstance(r["end_dt"], datetime) else r["end_dt"]
+            else:
+                end_d = start_d
+            # DTEND is exclusive for all-day; add one day
+            props.append(("DTSTART;VALUE=DATE", start_d.strftime("%Y%m%d")))
+            props.append(("DTEND;VALUE=DATE", (end_d + timedelta(days=1)).strftime("%Y%m%d")))
+    else:
+        # No dates parsed → create all-day placeholder for today
+        today = date.today()
+        props.append(("DTSTART;VALUE=DATE", today.strftime("%Y%m%d")))
+        props.append(("DTEND;VALUE=DATE", (today + timedelta(days=1)).strftime("%Y%m%d")))
+
+    return "BEGIN:VEVENT\r\n" + "".join(fold_line(f"{k}:{v}") for k, v in props) + "END:VEVENT\r\n"
+
 def write_ics(records):
     os.makedirs(OUT_DIR, exist_ok=True)
-    cal = Calendar()
-    for r in records:
-        ev = Event()
-        ev.uid = event_uid(r["url"])
-        ev.name = r["title"]
-        ev.location = r["location"]
-        ev.description = r["description"]
-
-        if r["start_dt"]:
-            if r["has_time"] or (isinstance(r["start_dt"], datetime) and r["start_dt"].time() != datetime.min.time()):
-                ev.begin = r["start_dt"]
-                if r["end_dt"]:
-                    ev.end = r["end_dt"]
-            else:
-                # All-day event(s)
-                start_d = r["start_dt"].date() if isinstance(r["start_dt"], datetime) else r["start_dt"]
-                if r["end_dt"]:
-                    end_d = r["end_dt"].date() if isinstance(r["end_dt"], datetime) else r["end_dt"]
-                else:
-                    end_d = start_d
-                # ics expects DTEND exclusive for all-day; add one day
-                ev.begin = start_d
-                ev.make_all_day()
-                ev.end = (end_d + timedelta(days=1))
-        else:
-            # No dates parsed → create all-day placeholder for today
-            ev.begin = date.today()
-            ev.make_all_day()
+    # Plain VCALENDAR/VEVENT text written in one go; no calendar object graph
+    dtstamp = ics_utc(datetime.now(timezone.utc))
+    body = "".join(make_vevent(r, dtstamp) for r in records)
 
-        cal.events.add(ev)
+    with open(ICS_PATH, "w", encoding="utf-8", newline="") as f:
+        f.write(ICS_HEADER + body + ICS_FOOTER)
+    print(f"Wrote ICS with {len(records)} events → {ICS_PATH}")
 
-    with open(ICS_PATH, "w", encoding="utf-8") as f:
-        f.writelines(cal)
-    print(f"Wrote ICS with {len(cal.events)} events → {ICS_PATH}")
+async def block_heavy(context, page):
+    # The block list lives on the page's target, so it holds across navigations
+    cdp = await context.new_cdp_session(page)
+    await cdp.send("Network.enable")
+    await cdp.send("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
 
 async def main():
-    results = []
     async with async_playwright() as p:
         browser = await p.chromium.launch()
-        page = await browser.new_page()
-        for url in URLS:
-            results.append(await scrape_one(page, url))
+        context = await browser.new_context()
+        await context.add_init_script(EXTRACTOR_JS)
+        # Fixed pool of pages recycled across URLs; never more pages than URLs
+        pages = asyncio.Queue()
+        for _ in range(min(len(URLS), MAX_PARALLEL)):
+            page = await context.new_page()
+            await block_heavy(context, page)
+            pages.put_nowait(page)
+
+        async def worker(url):
+            # The queue doubles as the concurrency limit: a URL waits until a page is free
+            page = await pages.get()
+            try:
+                return await asyncio.wait_for(scrape_one(page, url), SCRAPE_TIMEOUT_S)
+            except (TimeoutError, PlaywrightTimeoutError):
+                print(f"Timed out scraping {url}; writing placeholder event")
+                return placeholder_record(url)
+            finally:
+                pages.put_nowait(page)
+
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(worker(u)) for u in URLS]
+        # Tasks were created in URL order, so results keep that order
+        results = [t.result() for t in tasks]
+        while not pages.empty():
+            await pages.get_nowait().close()
+        await context.close()
         await browser.close()
     write_ics(results)
 